@@ -20,9 +20,24 @@ if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
 import hashlib
 import argparse
+import filecmp
+import queue
+import sqlite3
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 
+# Optional: BLAKE3 (pip install blake3)
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
 # ============================================================================
 # ANSI Colors
 # ============================================================================
@@ -32,41 +47,290 @@ BLUE = "\033[34m"
 YELLOW = "\033[33m"
 RESET = "\033[0m"
 
+# ============================================================================
+# Hash Algorithms
+# ============================================================================
+# Supported content hashes and their display names
+HASH_ALGORITHMS = {
+    "sha256": "SHA-256",
+    "blake2b": "BLAKE2b",
+    "blake3": "BLAKE3",
+}
+DEFAULT_HASH = "sha256"
+
+# ============================================================================
+# Hashing Pool
+# ============================================================================
+# Number of threads used to hash files in parallel. hashlib releases the GIL
+# while hashing, so threads scale across cores without any process overhead.
+HASH_WORKERS = 2 * (os.cpu_count() or 1)
+# Read size when streaming a file into the hasher (one GIL-free block each)
+HASH_BUFFER_SIZE = 4 * 1024 * 1024
+
+# ============================================================================
+# Fingerprinting
+# ============================================================================
+# Size of the leading block hashed before anything else
+HEAD_SIZE = 4096
+# Size of each sampled window used for the fingerprint
+FINGERPRINT_WINDOW = 64 * 1024
+# Smaller files are fully hashed directly (sampling would read most of them)
+FINGERPRINT_MIN_SIZE = 196 * 1024
+# Share of a file's progress credited by each pre-filter stage it goes through
+PREFILTER_PROGRESS = 0.25
+
+# ============================================================================
+# Hash Cache
+# ============================================================================
+# Full hashes are remembered between runs (opt-in with --cache), keyed by path
+# and validated against the file's size, mtime, ctime, device and inode.
+# ctime can't be set back by utime(), so edits that restore the mtime are caught.
+HASH_CACHE_VERSION = 3
+
+def hash_cache_path() -> str:
+    """Location of the persistent hash cache (user cache directory)."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "duplicatefinder", "hashes.sqlite")
+
+def open_hash_cache():
+    """Opens (creating if needed) the hash cache. Returns None if unavailable."""
+    path = hash_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path)
+        # Start over when the layout changes (older caches had fewer checks)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != HASH_CACHE_VERSION:
+            conn.execute("DROP TABLE IF EXISTS hashes")
+            conn.execute(f"PRAGMA user_version = {HASH_CACHE_VERSION}")
+        # Paths are stored as bytes (os.fsencode) so that any file name fits
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path BLOB NOT NULL, algo TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, ctime_ns INTEGER NOT NULL,"
+            " dev INTEGER NOT NULL, ino INTEGER NOT NULL, digest BLOB NOT NULL,"
+            " PRIMARY KEY (path, algo))")
+        return conn
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Hash cache disabled ({e})", file=sys.stderr)
+        return None
+
+def cache_key(st) -> tuple:
+    """Stat fields a cached hash must still match."""
+    return (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_dev, st.st_ino)
+
+def lookup_cached_hashes(conn, candidates: list, file_stats: dict, algo: str):
+    """
+    Splits (size, path) candidates into cache hits and misses, using the stat
+    results collected during traversal.
+    Returns [(size, path, digest)] for hits and [(size, path, key)] for misses,
+    where key is None if the file can't be cached. Returns None if the cache
+    can't be read.
+    """
+    hits = []
+    misses = []
+    try:
+        for size, p in candidates:
+            key = cache_key(file_stats[p])
+            try:
+                row = conn.execute(
+                    "SELECT digest FROM hashes WHERE path = ? AND algo = ? AND size = ?"
+                    " AND mtime_ns = ? AND ctime_ns = ? AND dev = ? AND ino = ?",
+                    (os.fsencode(p), algo) + key).fetchone()
+            except OverflowError: # stat values too large for SQLite
+                row = key = None
+            if row:
+                hits.append((size, p, row[0]))
+            else:
+                misses.append((size, p, key))
+    except sqlite3.Error as e:
+        print(f"Warning: Hash cache disabled ({e})", file=sys.stderr)
+        return None
+    return hits, misses
+
+def store_cached_hashes(conn, rows: list, algo: str):
+    """Saves (path, key, digest) rows to the hash cache."""
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO hashes"
+            " (path, algo, size, mtime_ns, ctime_ns, dev, ino, digest)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(os.fsencode(p), algo) + key + (h,) for p, key, h in rows])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not update hash cache ({e})", file=sys.stderr)
+
+def prune_hash_cache(conn, directory: str, scanned_paths: set):
+    """Removes cached hashes of files under directory that this scan didn't find."""
+    prefix = os.fsencode(os.path.join(directory, ""))
+    # All byte strings starting with prefix sort between prefix and this bound
+    upper = prefix[:-1] + bytes([prefix[-1] + 1])
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT path FROM hashes WHERE path >= ? AND path < ?",
+            (prefix, upper)).fetchall()
+        gone = [row for row in rows if os.fsdecode(row[0]) not in scanned_paths]
+        conn.executemany("DELETE FROM hashes WHERE path = ?", gone)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not update hash cache ({e})", file=sys.stderr)
+
 # ============================================================================
 # Helpers
 # ============================================================================
+SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
 
 def format_size(size_bytes: int) -> str:
     """Formats file size into a human-readable string (e.g., 4.2 MB)."""
-    s = float(size_bytes)
-    units = ["B", "KB", "MB", "GB", "TB"]
-    i = 0
-    while s >= 1024 and i < 4:
-        s /= 1024
-        i += 1
-    
     # Match C++ precision logic: 0 decimals for Bytes, 2 for others
-    if i == 0:
-        return f"{int(s)} {units[i]}"
-    else:
-        return f"{s:.2f} {units[i]}"
-
-def compute_file_hash(path: str) -> str:
-    """Computes the SHA-256 hash of a file."""
-    sha256 = hashlib.sha256()
-    buffer_size = 8192
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+
+    # Each unit is 2^10 times the previous one
+    i = min((size_bytes.bit_length() - 1) // 10, 4)
+    return f"{size_bytes / (1 << (i * 10)):.2f} {SIZE_UNITS[i]}"
+
+def new_hasher(algo: str = DEFAULT_HASH):
+    """Creates a hash object for one of HASH_ALGORITHMS."""
+    if algo == "blake3":
+        return blake3.blake3()
+    if algo == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    return hashlib.sha256()
+
+def compute_file_hash(path: str, algo: str = DEFAULT_HASH):
+    """Computes the raw content digest of a file (SHA-256 by default), or None on error."""
+    single_read_size = 1 << 20
     try:
-        with open(path, "rb") as f:
+        # Unbuffered: data goes from read(2) straight into our buffers
+        with open(path, "rb", buffering=0) as f:
+            # Small files are hashed from a single read
+            if os.fstat(f.fileno()).st_size < single_read_size:
+                h = new_hasher(algo)
+                h.update(f.read())
+                return h.digest()
+
+            # Hint the kernel to read ahead aggressively (Linux)
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass # only a hint
+
+            # Python 3.11+: hashlib reads the file itself, releasing the GIL
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, partial(new_hasher, algo),
+                                           _bufsize=HASH_BUFFER_SIZE).digest()
+
+            h = new_hasher(algo)
+            buffer = memoryview(bytearray(HASH_BUFFER_SIZE))
             while True:
-                chunk = f.read(buffer_size)
-                if not chunk:
+                n = f.readinto(buffer)
+                if not n:
                     break
-                sha256.update(chunk)
+                h.update(buffer[:n])
     except OSError as e:
         print(f"Warning: Skipping {path} ({e})", file=sys.stderr)
-        return ""
+        return None
     
-    return sha256.hexdigest()
+    return h.digest()
+
+def compute_head_hash(path: str):
+    """Hashes the first HEAD_SIZE bytes of a file (cheapest pre-filter)."""
+    try:
+        # Buffered: read(n) keeps reading until it has n bytes or reaches EOF
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read(HEAD_SIZE)).digest()
+    except OSError as e:
+        print(f"Warning: Skipping {path} ({e})", file=sys.stderr)
+        return None
+
+def compute_fingerprint(path: str, size: int):
+    """Hashes the first, middle and last windows of a file (cheap pre-filter)."""
+    offsets = (0, size // 2 - FINGERPRINT_WINDOW // 2, size - FINGERPRINT_WINDOW)
+    sha256 = hashlib.sha256()
+    try:
+        # Buffered, so that each window is read in full even on short reads
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                sha256.update(f.read(FINGERPRINT_WINDOW))
+    except OSError as e:
+        print(f"Warning: Skipping {path} ({e})", file=sys.stderr)
+        return None
+
+    return sha256.digest()
+
+def prefilter_progress(size: int) -> float:
+    """Share of a file's progress already credited by the pre-filter stages it went through."""
+    return PREFILTER_PROGRESS * ((size > HEAD_SIZE) + (size >= FINGERPRINT_MIN_SIZE))
+
+def split_candidates(candidates: list, keys, on_key=None):
+    """
+    Regroups (size, path) candidates by (size, key), calling on_key() after each key.
+    Returns the candidates still sharing a group and the number of files eliminated.
+    """
+    groups = defaultdict(list)
+    eliminated = 0
+    for (size, p), key in zip(candidates, keys):
+        if on_key is not None:
+            on_key()
+        if key is None: # unreadable file
+            eliminated += 1
+        else:
+            groups[(size, key)].append(p)
+
+    survivors = []
+    for (size, _), paths in groups.items():
+        if len(paths) < 2:
+            eliminated += len(paths)
+        else:
+            survivors.extend((size, p) for p in paths)
+
+    return survivors, eliminated
+
+def verify_group(paths: list) -> list:
+    """
+    Byte-by-byte comparison of files sharing a hash.
+    Returns the list of groups of truly identical files (normally just one).
+    Files that can't be read are reported and left out.
+    """
+    groups = []
+    for p in paths:
+        i = 0
+        while i < len(groups):
+            group = groups[i]
+            try:
+                same = filecmp.cmp(group[0], p, shallow=False)
+            except OSError as e:
+                # Drop whichever file failed; p keeps being compared if it wasn't it
+                bad = group[0] if e.filename == group[0] else p
+                print(f"Warning: Skipping {bad} ({e})", file=sys.stderr)
+                if bad == p:
+                    break
+                group.pop(0)
+                if not group:
+                    groups.pop(i)
+                continue
+
+            if same:
+                group.append(p)
+                break
+            i += 1
+        else:
+            groups.append([p])
+    return [group for group in groups if len(group) > 1]
+
+def print_footer(algo: str = DEFAULT_HASH):
+    """Final footer messages (always displayed)."""
+    if algo == "sha256":
+        method = "SHA-256"
+    else:
+        method = f"{HASH_ALGORITHMS[algo]} and byte-by-byte comparison"
+    print(f"{YELLOW}Don't worry: all duplicate files have been verified using {method} and you can be 100% confident that files detected as duplicates are identical.{RESET}")
+    print(f"{BLUE}If you want to support development, you can make a donation here: https://www.paypal.com/paypalme/EnricoArama{RESET}")
 
 def print_progress_bar(current: int, total: int, bar_length: int = 30):
     """Displays a green progress bar in the terminal."""
@@ -76,113 +340,287 @@ def print_progress_bar(current: int, total: int, bar_length: int = 30):
     bar = "█" * filled_length + "-" * (bar_length - filled_length)
     
     # \r is carriage return to update the line in-place
-    sys.stdout.write(f"\r{GREEN}[{bar}] {current}/{total} ({percentage}%){RESET}")
+    sys.stdout.write(f"\r{GREEN}[{bar}] {int(current)}/{total} ({percentage}%){RESET}")
     sys.stdout.flush()
 
+# Minimum delay between two progress bar redraws (~30 Hz)
+PROGRESS_INTERVAL = 1 / 30
+_last_tick = 0.0
+_last_filled = -1
+
+def update_progress_bar(current: int, total: int, bar_length: int = 30):
+    """
+    Redraws the progress bar only when it visibly changes or enough time has passed.
+    The final state (current == total) is always drawn.
+    """
+    global _last_tick, _last_filled
+    fraction = current / total if total > 0 else 1.0
+    filled_length = int(bar_length * fraction)
+    now = time.monotonic()
+    if (current < total and filled_length == _last_filled
+            and now - _last_tick < PROGRESS_INTERVAL):
+        return
+
+    _last_tick = now
+    _last_filled = filled_length
+    print_progress_bar(current, total, bar_length)
+
 # ============================================================================
 # Scanning Logic
 # ============================================================================
 
-def run_scan(directory_path: str):
-    target_dir = Path(directory_path).resolve()
+def scan_directory(dirpath: str):
+    """Lists one directory. Returns its regular files as (path, stat_result) and its subdirectories."""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append((entry.path, entry.stat(follow_symlinks=False)))
+                except OSError:
+                    pass
+    except OSError as e:
+        print(f"Warning: Skipping {dirpath} ({e})", file=sys.stderr)
+    return files, subdirs
+
+def walk_threaded(directory: str, threads: int):
+    """
+    Same as walk(), but directories are listed by worker threads so that several
+    listings are in flight at once (scandir/stat release the GIL). This pays off
+    on high-latency filesystems (network shares, cold HDDs); the yield order is not fixed.
+    """
+    dirs = queue.Queue()
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        while True:
+            dirpath = dirs.get()
+            if dirpath is None or stop.is_set():
+                return
+            results.put(scan_directory(dirpath))
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(threads)]
+    for t in workers:
+        t.start()
+
+    try:
+        dirs.put(directory)
+        outstanding = 1
+        while outstanding:
+            files, subdirs = results.get()
+            outstanding -= 1
+            for d in subdirs:
+                dirs.put(d)
+            outstanding += len(subdirs)
+            yield from files
+    finally:
+        stop.set()
+        for _ in workers:
+            dirs.put(None)
+
+def walk(directory: str, threads: int = 0):
+    """
+    Recursively yields (path, stat_result) for regular files, skipping symlinks.
+    With threads > 1 the traversal is delegated to walk_threaded().
+    """
+    if threads > 1:
+        yield from walk_threaded(directory, threads)
+        return
+
+    pending = [directory]
+    while pending:
+        files, subdirs = scan_directory(pending.pop())
+        # Reversed so that directories are visited in listing order
+        pending.extend(reversed(subdirs))
+        yield from files
+
+def run_scan(directory_path: str, algo: str = DEFAULT_HASH, use_cache: bool = False,
+             walk_threads: int = 0):
+    # Path is only used to resolve the argument; the scan itself works on str paths
+    target_dir = str(Path(directory_path).resolve())
     
-    if not target_dir.exists() or not target_dir.is_dir():
+    if not os.path.isdir(target_dir):
         print(f"Error: Directory not found or invalid: {target_dir}", file=sys.stderr)
         sys.exit(1)
 
     print(f"Counting files in {target_dir} ...")
     
-    all_files = []
+    # Step 1: Collect (size, path, inode, stat) entries; they are grouped by size
+    # once sorted. The inode is only kept for files with several hard links, and
+    # the stat result only when the hash cache needs it.
+    sized_files = []
     try:
-        for root, _, files in os.walk(target_dir):
-            for name in files:
-                filepath = Path(root) / name
-                # Simple check for regular file (excluding symlinks as per previous logic)
-                if not filepath.is_symlink():
-                    all_files.append(filepath)
+        for path, st in walk(target_dir, walk_threads):
+            # st_ino is 0 where the platform doesn't report it (Windows scandir)
+            inode = (st.st_dev, st.st_ino) if st.st_nlink > 1 and st.st_ino else None
+            sized_files.append((st.st_size, path, inode, st if use_cache else None))
     except Exception as e:
         print(f"Error during directory traversal: {e}", file=sys.stderr)
         sys.exit(1)
 
-    total_count = len(all_files)
+    total_count = len(sized_files)
     if total_count == 0:
         print("\nNo files found to scan.")
         # We still print footer as requested
-        print(f"\n{YELLOW}Don't worry: all duplicate files have been verified using SHA-256 and you can be 100% confident that files detected as duplicates are identical.{RESET}")
-        print(f"{BLUE}If you want to support development, you can make a donation here: https://www.paypal.com/paypalme/EnricoArama{RESET}")
+        print()
+        print_footer(algo)
         return
 
     print(f"Processing {total_count} files ...")
-    
-    # Step 1: Group files by size
-    files_by_size = defaultdict(list)
-    processed_count = 0
-    
-    # Temporary list for files that actually need hashing
-    potential_duplicates_by_size = defaultdict(list)
-    
-    for filepath in all_files:
-        try:
-            size = filepath.stat().st_size
-            files_by_size[size].append(filepath)
-        except OSError:
-            pass
-        
-        # We count it as processed for the size check stage
-        # But we only reach 100% after hashing, so we'll redistribute the progress.
-        # Actually, let's just use a single continuous counter.
-        # To make it smooth, we show progress here, but we'll continue the same counter in the hashing phase.
-        # However, it's better to:
-        # 1. Quick size scan (optional bar)
-        # 2. Hashing (the real slow part)
-        
-    # Let's refine the progress: 
-    # Files that don't need hashing reach "processed" state during hashing loop.
-    # Files that DO need hashing reach "processed" state AFTER hashing.
-    
-    # To keep total_count accurate:
-    # 1. Identify files that ARE NOT potential duplicates (unique size).
-    # 2. Increment progress for them immediately.
-    # 3. Increment progress for the rest as they are hashed.
-
-    unique_sized_files_count = sum(1 for paths in files_by_size.values() if len(paths) < 2)
-    processed_count = unique_sized_files_count
-    
-    # Show initial progress for skipping unique sizes
-    print_progress_bar(processed_count, total_count)
 
+    # Single pass over the size groups:
+    # - hard links to an already seen inode are set aside: they are the same
+    #   file on disk, so they need no hashing and waste no space
+    # - files with a unique size cannot be duplicates and are processed immediately
+    # - empty files are all identical, no hashing needed
+    # - everything else becomes a (size, path) candidate for hashing
     duplicates = []
-    
-    for size, paths in files_by_size.items():
+    candidates = []
+    file_stats = {}
+    seen_inodes = {}
+    hardlinks_by_inode = defaultdict(list)
+    processed_count = 0
+    # Traversal order may vary between runs; sorting by (size, path) keeps the
+    # output (and the file suggested to keep) deterministic
+    sized_files.sort(key=itemgetter(0, 1))
+    for size, group in groupby(sized_files, key=itemgetter(0)):
+        entries = []
+        for _, p, inode, st in group:
+            if inode is None:
+                entries.append((p, st))
+            elif inode in seen_inodes:
+                hardlinks_by_inode[inode].append(p)
+                processed_count += 1
+            else:
+                seen_inodes[inode] = p
+                entries.append((p, st))
+        paths = [p for p, _ in entries]
+
         if len(paths) < 2:
-            continue
-        
-        # Optimization: empty files
-        if size == 0:
+            processed_count += len(paths)
+        elif size == 0:
             duplicates.append({
                 'file_size': 0,
                 'files': paths
             })
             processed_count += len(paths)
-            print_progress_bar(processed_count, total_count)
-            continue
-
-        files_by_hash = defaultdict(list)
-        for p in paths:
-            h = compute_file_hash(str(p))
-            processed_count += 1
-            print_progress_bar(processed_count, total_count)
-            
-            if h: # if hash computation succeeded
-                files_by_hash[h].append(p)
-        
+        else:
+            candidates.extend((size, p) for p in paths)
+            if use_cache:
+                file_stats.update(entries)
+
+    # Every file found, used to prune the cache of files that are gone
+    scanned_paths = {p for _, p, _, _ in sized_files} if use_cache else None
+
+    # The size list is no longer needed; free it before hashing
+    del sized_files
+
+    # Show initial progress for skipping unique sizes
+    update_progress_bar(processed_count, total_count)
+
+    # Each pre-filter stage a file goes through credits part of its progress,
+    # the rest is credited once it is eliminated or fully hashed
+    def advance(amount: float):
+        nonlocal processed_count
+        processed_count += amount
+        update_progress_bar(processed_count, total_count)
+
+    def advance_prefilter():
+        advance(PREFILTER_PROGRESS)
+
+    # One thread pool serves all hashing stages (results come back in order)
+    executor = ThreadPoolExecutor(max_workers=HASH_WORKERS)
+
+    # Step 2: Hash the first block of each file; differing files almost
+    # always diverge there. Files no larger than the block go straight to Step 4.
+    to_hash = [(size, p) for size, p in candidates if size <= HEAD_SIZE]
+    headed = [(size, p) for size, p in candidates if size > HEAD_SIZE]
+
+    survivors, eliminated = split_candidates(
+        headed, executor.map(compute_head_hash, [p for _, p in headed]), advance_prefilter)
+    advance(eliminated * (1 - PREFILTER_PROGRESS))
+    del candidates, headed
+
+    # Step 3: Fingerprint large files from sampled windows.
+    # Only files sharing size and fingerprint need a full hash.
+    to_hash.extend((size, p) for size, p in survivors if size < FINGERPRINT_MIN_SIZE)
+    sampled = [(size, p) for size, p in survivors if size >= FINGERPRINT_MIN_SIZE]
+
+    survivors, eliminated = split_candidates(
+        sampled, executor.map(compute_fingerprint,
+                              [p for _, p in sampled],
+                              [size for size, _ in sampled]),
+        advance_prefilter)
+    to_hash.extend(survivors)
+    advance(eliminated * (1 - 2 * PREFILTER_PROGRESS))
+    del sampled, survivors
+
+    # Step 4: Full hashes are reused from the cache when the file is unchanged,
+    # otherwise computed in the thread pool, then collated by size group
+    hashes_by_size = defaultdict(lambda: defaultdict(list))
+    cache = open_hash_cache() if use_cache else None
+    lookup = lookup_cached_hashes(cache, to_hash, file_stats, algo) if cache is not None else None
+    if lookup is None:
+        if cache is not None: # unreadable cache: carry on without it
+            cache.close()
+            cache = None
+        cached, to_compute = [], [(size, p, None) for size, p in to_hash]
+    else:
+        cached, to_compute = lookup
+    del file_stats, lookup
+
+    digests = {p: h for _, p, h in cached}
+    advance(sum(1 - prefilter_progress(size) for size, _, _ in cached))
+
+    computed = []
+    hashes = executor.map(partial(compute_file_hash, algo=algo), [p for _, p, _ in to_compute])
+    for (size, p, key), h in zip(to_compute, hashes):
+        advance(1 - prefilter_progress(size))
+
+        if h is not None: # if hash computation succeeded
+            digests[p] = h
+            if key is not None:
+                computed.append((p, key, h))
+
+    executor.shutdown()
+
+    if cache is not None:
+        store_cached_hashes(cache, computed, algo)
+        prune_hash_cache(cache, target_dir, scanned_paths)
+        cache.close()
+    del cached, to_compute, computed, scanned_paths
+
+    # Collated in to_hash order, so which files came from the cache doesn't
+    # change the order inside a group (and thus the file suggested to keep)
+    for size, p in to_hash:
+        h = digests.get(p)
+        if h is not None:
+            hashes_by_size[size][h].append(p)
+    del to_hash, digests
+
+    for size, files_by_hash in hashes_by_size.items():
         for h, final_paths in files_by_hash.items():
-            if len(final_paths) > 1:
+            if len(final_paths) < 2:
+                continue
+
+            # Non SHA-256 hashes are confirmed by comparing the bytes
+            groups = [final_paths] if algo == "sha256" else verify_group(final_paths)
+            for group in groups:
                 duplicates.append({
                     'file_size': size,
-                    'files': final_paths
+                    'files': group
                 })
 
+        # Drop the bucket (and its non-duplicate paths) as soon as it is done
+        files_by_hash.clear()
+
+    del hashes_by_size
+
     # Clear progress bar line
     sys.stdout.write("\r" + " " * 60 + "\r")
     sys.stdout.flush()
@@ -199,6 +637,17 @@ def run_scan(directory_path: str):
     total_files = 0
     total_wasted_bytes = 0
 
+    # The whole report is built in memory and written at once
+    out = []
+    append = out.append
+
+    # Tree branches with their color codes, combined once outside the loops
+    keep_branch = f" ├─ {GREEN}"
+    keep_last = f" └─ {GREEN}"
+    remove_branch = f" ├─ {RED}"
+    remove_last = f" └─ {RED}"
+    reset_nl = f"{RESET}\n"
+
     for group in duplicates:
         files = group['files']
         size = group['file_size']
@@ -206,35 +655,48 @@ def run_scan(directory_path: str):
         
         if count == 0: continue
 
-        rep_name = files[0].name
+        rep_name = os.path.basename(files[0])
         
         # First file is GREEN (Keep)
-        print(f"📄 {GREEN}{rep_name} (x{count}){RESET} — identical content")
-
-        for i, fpath in enumerate(files):
-            is_last = (i == count - 1)
-            prefix = "└─ " if is_last else "├─ "
-            
-            # First file (index 0) gets GREEN, others RED
-            color = GREEN if i == 0 else RED
-            print(f" {prefix}{color}{fpath}{RESET}")
+        append(f"📄 {GREEN}{rep_name} (x{count}){RESET} — identical content\n")
+        append((keep_last if count == 1 else keep_branch) + files[0] + reset_nl)
+
+        # Others are RED
+        for fpath in files[1:-1]:
+            append(remove_branch + fpath + reset_nl)
+        if count > 1:
+            append(remove_last + files[-1] + reset_nl)
         
         # Advice message in BLUE
-        print(f"{BLUE}Tip: keep only the file {files[0].name} and remove those highlighted in red.{RESET}")
-        print()
+        append(f"{BLUE}Tip: keep only the file {rep_name} and remove those highlighted in red.{RESET}\n\n")
 
         total_files += count
         total_wasted_bytes += (count - 1) * size
 
     if duplicates:
-        print(f"Total duplicate groups: {len(duplicates)}")
-        print(f"Total duplicated files: {total_files}")
-        print(f"Total wasted space: {format_size(total_wasted_bytes)}")
+        append(f"Total duplicate groups: {len(duplicates)}\n")
+        append(f"Total duplicated files: {total_files}\n")
+        append(f"Total wasted space: {format_size(total_wasted_bytes)}\n")
     
+    if hardlinks_by_inode:
+        append("\nFound hard-linked files (same file on disk, no wasted space):\n\n")
+
+        for inode, links in hardlinks_by_inode.items():
+            files = [seen_inodes[inode]] + links
+            count = len(files)
+
+            append(f"🔗 {BLUE}{os.path.basename(files[0])} (x{count}){RESET} — hard links\n")
+            for fpath in files[:-1]:
+                append(" ├─ " + fpath + "\n")
+            append(" └─ " + files[-1] + "\n\n")
+
+        append(f"Total hard-linked groups: {len(hardlinks_by_inode)}\n")
+
+    sys.stdout.write("".join(out))
+
     # Final footer messages (always displayed)
     print()
-    print(f"{YELLOW}Don't worry: all duplicate files have been verified using SHA-256 and you can be 100% confident that files detected as duplicates are identical.{RESET}")
-    print(f"{BLUE}If you want to support development, you can make a donation here: https://www.paypal.com/paypalme/EnricoArama{RESET}")
+    print_footer(algo)
 
 # ============================================================================
 # Main Helper
@@ -245,12 +707,21 @@ def print_help(prog_name: str):
     print("Commands:")
     print("  scan \"DIRECTORY_PATH\"    Scan the directory recursively for duplicate files.")
     print("  --help                   Show this help message.\n")
+    print("Options:")
+    print("  --hash ALGORITHM         Content hash: sha256 (default), blake2b or blake3.")
+    print("                           blake2b/blake3 are faster and duplicates are then")
+    print("                           confirmed with a byte-by-byte comparison.")
+    print("  --cache                  Remember hashes between scans so that unchanged files")
+    print("                           aren't hashed again (makes repeated scans faster).")
+    print("  --walk-threads N         List directories with N threads (e.g. 16). Faster on")
+    print("                           network drives, slower on local disks.\n")
     print("Description:")
     print("  DuplicateFinder detects file duplicates based on EXACT CONTENT.")
     print("  File names and timestamps are ignored.")
     print("  It uses file size grouping and SHA-256 hashing for accuracy.\n")
     print("Example:")
     print(f"  {prog_name} scan \"C:\\Users\\MyUser\\Documents\"")
+    print(f"  {prog_name} scan \"C:\\Users\\MyUser\\Documents\" --hash blake3")
 
 # ============================================================================
 # Main Entry Point
@@ -273,7 +744,33 @@ def main():
             print(f"Usage: {sys.argv[0]} scan \"DIRECTORY_PATH\"")
             sys.exit(1)
         
-        run_scan(sys.argv[2])
+        algo = DEFAULT_HASH
+        use_cache = False
+        walk_threads = 0
+        options = sys.argv[3:]
+        while options:
+            opt = options.pop(0)
+            if opt == "--hash" and options:
+                algo = options.pop(0)
+            elif opt.startswith("--hash="):
+                algo = opt.split("=", 1)[1]
+            elif opt == "--cache":
+                use_cache = True
+            elif opt == "--walk-threads" and options and options[0].isdigit():
+                walk_threads = int(options.pop(0))
+            else:
+                print(f"Unknown option: {opt}", file=sys.stderr)
+                print_help(sys.argv[0])
+                sys.exit(1)
+
+        if algo not in HASH_ALGORITHMS:
+            print(f"Error: Unknown hash algorithm: {algo} (choose from {', '.join(HASH_ALGORITHMS)}).", file=sys.stderr)
+            sys.exit(1)
+        if algo == "blake3" and blake3 is None:
+            print("Error: --hash blake3 requires the 'blake3' package (pip install blake3).", file=sys.stderr)
+            sys.exit(1)
+
+        run_scan(sys.argv[2], algo, use_cache, walk_threads)
         sys.exit(0)
 
     print(f"Unknown command: {arg1}", file=sys.stderr)